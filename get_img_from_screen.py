@@ -4,7 +4,7 @@ import traceback
 
 import arcpy
 
-from utils import get_iso_date, buffer_extent, stac_url, stac_collections, search_stac, get_data
+from utils import get_iso_date, buffer_extent, stac_url, stac_collections, search_stac, add_search_messages, get_data
 
 
 class GetImgFromScreen(object):
@@ -104,12 +104,13 @@ class GetImgFromScreen(object):
             )
             arcpy.AddMessage(user_param)
 
+            # discard STAC searches from previous runs
+            search_stac.cache_clear()
+
             # create necessary folder
-            temp_dir = os.path.join(out_dir, "temp")
-            for _dir in [out_dir, temp_dir]:
-                if not os.path.exists(_dir):
-                    os.makedirs(_dir)
-                    arcpy.AddMessage(f"created {_dir}")
+            if not os.path.exists(out_dir):
+                os.makedirs(out_dir)
+                arcpy.AddMessage(f"created {out_dir}")
 
             # get the current map extent
             aprx = arcpy.mp.ArcGISProject("CURRENT")
@@ -123,10 +124,10 @@ class GetImgFromScreen(object):
             end_date_iso = get_iso_date(end_date)
             scene_info = search_stac(url=stac_url, b_box=buff_bb_wgs84, start_date=start_date_iso,
                                      end_date=end_date_iso, collections=stac_collections)
+            add_search_messages(scene_info)
 
             # download image and metadata
-            get_data(scene_info=scene_info, out_prefix=out_prefix, out_dir=out_dir, temp_dir=temp_dir,
-                     clip_extent=buff_poly_wgs84)
+            get_data(scene_info=scene_info, out_prefix=out_prefix, out_dir=out_dir, clip_extent=buff_poly_wgs84)
 
             return
 
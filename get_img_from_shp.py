@@ -4,7 +4,8 @@ import traceback
 
 import arcpy
 
-from utils import get_iso_date, buffer_extent, stac_url, stac_collections, search_stac, get_data
+from utils import get_iso_date, get_buffered_polygons, stac_url, stac_collections, search_stac, search_stac_batch, \
+    group_bboxes, get_footprints, filter_scenes, get_jobs, download_jobs
 
 
 class GetImgFromShp(object):
@@ -117,35 +118,42 @@ class GetImgFromShp(object):
             )
             arcpy.AddMessage(user_param)
 
+            # discard STAC searches from previous runs
+            search_stac.cache_clear()
+
             # create necessary folder
-            temp_dir = os.path.join(out_dir, "temp")
-            for _dir in [out_dir, temp_dir]:
-                if not os.path.exists(_dir):
-                    os.makedirs(_dir)
-                    arcpy.AddMessage(f"created {_dir}")
+            if not os.path.exists(out_dir):
+                os.makedirs(out_dir)
+                arcpy.AddMessage(f"created {out_dir}")
+
+            # read all polygons first and get their buffered bounding box and polygon in WGS84
+            polygons = get_buffered_polygons(in_fc=in_fc, out_prefix_field=out_prefix_field, buffer=buffer)
 
-            # loop for each polygon
+            # search for scene info from STAC API. polygons are grouped by a coarse grid cell and each group is
+            # searched once with the union of its extents. distinct searches run concurrently
             start_date_iso = get_iso_date(start_date)
             end_date_iso = get_iso_date(end_date)
-            with arcpy.da.SearchCursor(in_fc, field_names=[out_prefix_field, "SHAPE@"]) as cursor:
-                for row in cursor:
-                    out_prefix = row[0]
-                    poly_extent = row[1]
+            search_bbs = group_bboxes(b_boxes=[buff_bb_wgs84 for _, buff_bb_wgs84, _ in polygons])
+            search_results = search_stac_batch(url=stac_url, b_boxes=search_bbs, start_date=start_date_iso,
+                                               end_date=end_date_iso, collections=stac_collections)
+            footprints = {search_bb: get_footprints(scene_info=scene_info)
+                          for search_bb, scene_info in search_results.items()}
 
-                    arcpy.AddMessage(f"Processing {out_prefix_field}: {out_prefix}")
+            # collect download jobs for each polygon from the scenes that intersect it
+            jobs = []
+            for (out_prefix, buff_bb_wgs84, buff_poly_wgs84), search_bb in zip(polygons, search_bbs):
+                arcpy.AddMessage(f"Processing {out_prefix_field}: {out_prefix}")
 
-                    # get buffered bounding box and polygon in WGS84
-                    buff_bb_wgs84, buff_poly_wgs84 = buffer_extent(extent_poly=poly_extent, buffer=buffer)
+                scene_info = filter_scenes(scene_info=search_results[search_bb], footprints=footprints[search_bb],
+                                           clip_extent=buff_poly_wgs84)
 
-                    # search for scene info from STAC API
-                    scene_info = search_stac(url=stac_url, b_box=buff_bb_wgs84, start_date=start_date_iso,
-                                             end_date=end_date_iso, collections=stac_collections)
+                jobs.extend(get_jobs(scene_info=scene_info, out_prefix=out_prefix, out_dir=out_dir,
+                                     clip_extent=buff_poly_wgs84))
 
-                    # download image and metadata
-                    get_data(scene_info=scene_info, out_prefix=out_prefix, out_dir=out_dir, temp_dir=temp_dir,
-                             clip_extent=buff_poly_wgs84)
+            # download image and metadata for all polygons
+            download_jobs(jobs=jobs)
 
-                    arcpy.AddMessage(f"Completed {out_prefix_field}: {out_prefix}")
+            arcpy.AddMessage(f"Completed {len(polygons)} polygons")
 
             return
 
@@ -1,142 +1,470 @@
+import logging
+import math
 import os
+import re
+import tempfile
 import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
+from contextlib import contextmanager
+from functools import lru_cache
 
-import arcpy
 import requests
-from arcpy import management
-from osgeo import gdal
 from requests.adapters import HTTPAdapter, Retry
 
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # STACK API info
 stac_url = "https://earth-search.aws.element84.com/v1/search"
-stac_collections = ["sentinel-2-l2a"]
+stac_collections = ("sentinel-2-l2a",)
+
+# HTTP cache for STAC and metadata responses (used when requests-cache is installed)
+http_cache_name = os.path.join(tempfile.gettempdir(), "s2dl_cache")
+http_cache_expire = 3600
+
+# GDAL options for reading cloud optimised geotiffs over http, set for the download thread only. the curl block
+# cache lives in the ArcGIS Pro process, so it is kept between tool runs of the same session
+gdal_config = {
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.TIF,.jp2",
+    "CPL_VSIL_CURL_USE_HEAD": "NO",
+    "CPL_VSIL_CURL_CACHE_SIZE": "1073741824",
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": "2",
+    "VSI_CACHE": "TRUE",
+    "VSI_CACHE_SIZE": "536870912",
+    "AWS_NO_SIGN_REQUEST": "YES",
+}
+
+# public S3 object url e.g. https://sentinel-cogs.s3.us-west-2.amazonaws.com/<key>
+s3_url_pattern = re.compile(
+    r"^https://(?P<bucket>[^./]+)\.s3\.(?:(?P<region>[a-z0-9-]+)\.)?amazonaws\.com/(?P<key>.+)$"
+)
+
+# size of the grid cells (in degrees) used to group nearby search extents
+search_cell_size = 1.0
+
+# number of concurrent STAC searches and downloads. kept small to be fair to the data provider
+search_workers = 4
+download_workers = 4
+
+# GDAL compression threads per download, so that concurrent downloads together use about one thread per core
+gdal_threads = max(1, (os.cpu_count() or 1) // download_workers)
+
+# messages are logged when running outside ArcGIS Pro
+logger = logging.getLogger(__name__)
+
+
+@lru_cache()
+def get_gdal():
+    """Import gdal on first use."""
+    from osgeo import gdal
+    return gdal
+
+
+@contextmanager
+def gdal_thread_config(options: dict):
+    """
+    Set GDAL options for the current thread only and restore the previous values on exit. The toolbox runs
+    inside the ArcGIS Pro process, so process wide options would also apply to every other GDAL user.
+    """
+    gdal = get_gdal()
+    previous = {key: gdal.GetThreadLocalConfigOption(key, None) for key in options}
+    for key, value in options.items():
+        gdal.SetThreadLocalConfigOption(key, value)
+
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            gdal.SetThreadLocalConfigOption(key, value)
+
+
+@lru_cache()
+def get_wgs84_sr():
+    """Get the spatial reference of the search extent and clip polygons."""
+    import arcpy
+    return arcpy.SpatialReference(4326)
+
+
+def add_message(message: str) -> None:
+    """Add an informative tool message."""
+    try:
+        import arcpy
+    except ImportError:
+        logger.info(message)
+        return
+
+    arcpy.AddMessage(message)
+
+
+def add_error(message: str) -> None:
+    """Add an error tool message."""
+    try:
+        import arcpy
+    except ImportError:
+        logger.error(message)
+        return
+
+    arcpy.AddError(message)
 
 
 def get_iso_date(date_str: date) -> str:
     """Convert date to ISO format yyyy-mm-dd"""
+    return f"{date_str.year:04d}-{date_str.month:02d}-{date_str.day:02d}"
+
+
+def get_buffer_dd(buffer: float) -> float:
+    """Convert a buffer in metres to degrees"""
+    return buffer / 100000  # 100 km = 1 degree (approx)
+
+
+def get_bbox_polygon(x_min: float, y_min: float, x_max: float, y_max: float) -> tuple:
+    """Return the WGS84 bounding box string and polygon for the given WGS84 bounds."""
+    import arcpy
+
     try:
-        return date_str.strftime('%Y-%m-%d')
+        # create bounding box string. this will be used as search extent
+        bb_wgs84 = f"{x_min},{y_min},{x_max},{y_max}"
+
+        # construct polygon. this will be used as clip fc
+        poly_wgs84 = arcpy.Extent(x_min, y_min, x_max, y_max, spatial_reference=get_wgs84_sr()).polygon
+
+        return bb_wgs84, poly_wgs84
+
     except Exception as e:
-        arcpy.AddError(f"Error converting date to ISO format: {traceback.format_exc()}")
+        add_error(f"Error creating bounding box polygon: {traceback.format_exc()}")
         raise
 
 
+def buffer_bounds(x_min: float, y_min: float, x_max: float, y_max: float, buffer: float) -> tuple:
+    """Buffer WGS84 bounds with the given buffer in metres and return WGS84 bounding box and polygon."""
+    buffer_dd = get_buffer_dd(buffer)
+
+    return get_bbox_polygon(x_min=x_min - buffer_dd, y_min=y_min - buffer_dd, x_max=x_max + buffer_dd,
+                            y_max=y_max + buffer_dd)
+
+
 def buffer_extent(extent_poly, buffer: float) -> tuple:
     """Buffer polygon extent with the given buffer in metres and return WGS84 bounding box and polygon."""
     try:
         # ensure the polygon is in WGS84 (EPSG:4326)
         if int(extent_poly.spatialReference.factoryCode) != 4326:
-            extent_poly_wgs84 = extent_poly.projectAs(arcpy.SpatialReference(4326))
+            extent_poly_wgs84 = extent_poly.projectAs(get_wgs84_sr())
         else:
             extent_poly_wgs84 = extent_poly
 
-        # calculate buffer in degrees. this will be used as search extent
-        buffer_dd = buffer / 100000  # 100 km = 1 degree (approx)
-        x_min = extent_poly_wgs84.extent.XMin - buffer_dd
-        x_max = extent_poly_wgs84.extent.XMax + buffer_dd
-        y_min = extent_poly_wgs84.extent.YMin - buffer_dd
-        y_max = extent_poly_wgs84.extent.YMax + buffer_dd
+        extent_wgs84 = extent_poly_wgs84.extent
+
+        return buffer_bounds(x_min=extent_wgs84.XMin, y_min=extent_wgs84.YMin, x_max=extent_wgs84.XMax,
+                             y_max=extent_wgs84.YMax, buffer=buffer)
+
+    except Exception as e:
+        add_error(f"Error creating buffered extent: {traceback.format_exc()}")
+        raise
+
+
+def read_shapefile_bounds(in_fc: str):
+    """
+    Read the WGS84 bounds of all shapefile features at once with pyogrio. Return the feature ids and an (n, 4)
+    array of bounds, NaN for null geometries. Return None if pyogrio or geopandas is not available or the
+    shapefile has no projection.
+    """
+    try:
+        import pyogrio
+        gdf = pyogrio.read_dataframe(in_fc, columns=[], fid_as_index=True)
+    except ImportError:
+        return None
+
+    if gdf.crs is None:
+        return None
 
-        # create buffered bounding box string
-        buff_bb_wgs84 = f"{x_min},{y_min},{x_max},{y_max}"
+    return gdf.index.tolist(), gdf.to_crs(4326).geometry.bounds.values
 
-        # construct buffered polygon. this will be used as clip fc
-        poly_array = arcpy.Array([
-            arcpy.Point(x_min, y_min),
-            arcpy.Point(x_min, y_max),
-            arcpy.Point(x_max, y_max),
-            arcpy.Point(x_max, y_min),
-            arcpy.Point(x_min, y_min)
-        ])
-        buff_poly_wgs84 = arcpy.Polygon(poly_array, spatial_reference=arcpy.SpatialReference(4326))
 
-        return buff_bb_wgs84, buff_poly_wgs84
+def get_buffered_polygons(in_fc: str, out_prefix_field: str, buffer: float) -> list:
+    """
+    Read each polygon of a feature class and return a list of (prefix, WGS84 bounding box, WGS84 polygon)
+    buffered with the given buffer in metres. Polygons without geometry are skipped. The geometry of
+    shapefiles is read in bulk with pyogrio when it is installed.
+    """
+    import arcpy
+
+    try:
+        polygons = []
+
+        shp_bounds = None
+        if in_fc.lower().endswith(".shp") and os.path.exists(in_fc):
+            shp_bounds = read_shapefile_bounds(in_fc)
+
+        if shp_bounds is not None:
+            import numpy as np
+
+            # buffer the bounds of all polygons at once
+            fids, bounds = shp_bounds
+            buffer_dd = get_buffer_dd(buffer)
+            bounds = bounds + np.array([-buffer_dd, -buffer_dd, buffer_dd, buffer_dd])
+            bounds_by_fid = dict(zip(fids, bounds.tolist()))
+
+            # prefixes are still read with a cursor (without geometry) so that they are formatted the same way
+            # on both paths, and joined to the bounds on the feature id
+            with arcpy.da.SearchCursor(in_fc, field_names=["OID@", out_prefix_field]) as cursor:
+                rows = [(oid, out_prefix) for oid, out_prefix in cursor]
+
+            if len(rows) == len(bounds_by_fid) and all(oid in bounds_by_fid for oid, _ in rows):
+                for oid, out_prefix in rows:
+                    x_min, y_min, x_max, y_max = bounds_by_fid[oid]
+                    if math.isnan(x_min):
+                        add_message(f"Warning: skipped {out_prefix_field}: {out_prefix} without geometry")
+                        continue
+                    polygons.append((out_prefix, *get_bbox_polygon(x_min=x_min, y_min=y_min, x_max=x_max,
+                                                                   y_max=y_max)))
+                return polygons
+
+            add_message(f"Warning: feature ids of {in_fc} do not match, reading polygons with a cursor")
+
+        # feature classes, layers and shapefiles without projection are read with a cursor
+        with arcpy.da.SearchCursor(in_fc, field_names=[out_prefix_field, "SHAPE@"]) as cursor:
+            for out_prefix, poly_extent in cursor:
+                if poly_extent is None or poly_extent.pointCount == 0:
+                    add_message(f"Warning: skipped {out_prefix_field}: {out_prefix} without geometry")
+                    continue
+                polygons.append((out_prefix, *buffer_extent(extent_poly=poly_extent, buffer=buffer)))
+
+        return polygons
 
     except Exception as e:
-        arcpy.AddError(f"Error creating buffered extent: {traceback.format_exc()}")
+        add_error(f"Error reading polygons from {in_fc}: {traceback.format_exc()}")
         raise
 
 
+def is_stac_response(response: requests.Response) -> bool:
+    """Only STAC search responses are cached, granule metadata is downloaded once and written to disk."""
+    return response.url.startswith(stac_url)
+
+
+@lru_cache()
 def get_session() -> requests.Session:
-    """Create a session with retries for HTTP requests."""
+    """Create a session with retries for HTTP requests. The session is shared so connections are reused."""
     try:
-        # set session and retry
-        session = requests.Session()
+        # set session and retry. search responses are cached and revalidated with ETag/Last-Modified if possible
+        if requests_cache is not None:
+            session = requests_cache.CachedSession(cache_name=http_cache_name, backend="sqlite",
+                                                   expire_after=http_cache_expire, cache_control=True,
+                                                   filter_fn=is_stac_response)
+        else:
+            session = requests.Session()
         retries = Retry(
             total=5,
             backoff_factor=0.1,
             status_forcelist=[500, 502, 503, 504]
         )
-        session.mount("https://", HTTPAdapter(max_retries=retries))
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=32, pool_maxsize=32, pool_block=False)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
 
         return session
 
     except requests.exceptions.RequestException as e:
-        arcpy.AddError(f"Error creating session: {traceback.format_exc()}")
+        add_error(f"Error creating session: {traceback.format_exc()}")
+        raise
+
+
+@lru_cache()
+def search_stac(url: str, b_box: str, start_date: str, end_date: str, collections: tuple) -> dict:
+    """
+    Search the STAC database for scenes within the specified bounding box and date range.
+    Results are memoized, call search_stac.cache_clear() at the start of each tool run.
+    Messages and errors are returned in scene_info["messages"] and scene_info["errors"] so that
+    search_stac can run on worker threads, add them with add_search_messages.
+    """
+    scene_info = defaultdict(list)
+    scenes_append = scene_info["scenes"].append
+    seen_ids = set()
+    limit = 50
+
+    params = {
+        "bbox": b_box,
+        "datetime": f"{start_date}T00:00:00Z/{end_date}T23:59:59Z",
+        "collections": collections,
+        "limit": limit,
+        "sortby": "+properties.datetime",
+    }
+
+    # set session and retry
+    session = get_session()
+
+    # pages are linked by a "next" token, so they are requested one after another
+    response = session.get(url=url, params=params)
+
+    while True:
+        if response.status_code != 200:
+            scene_info["errors"].append(f"Error in request: {response.status_code}")
+            break
+
+        if orjson is not None:
+            response_json = orjson.loads(response.content)
+        else:
+            response_json = response.json()
+
+        # the context extension is optional and only used for messages
+        context = response_json.get("context") or {}
+        matched = context.get("matched")
+        returned = context.get("returned")
+        scene_info["messages"].append(f"limit : {limit}, matched : {matched}, returned : {returned})")
+
+        if "features" not in response_json:
+            scene_info["errors"].append(f"Error in response: no features returned by {response.url}")
+            break
+
+        # stop on an empty page or when there is no next page
+        features = response_json.get("features") or []
+        if not features:
+            break
+
+        next_url = None
+        for link in response_json.get("links") or []:
+            if link.get("rel") == "next":
+                next_url = link.get("href")
+
+        for feature in features:
+            # skip scenes repeated across pages
+            scene_id = feature.get("id")
+            if scene_id in seen_ids:
+                continue
+            seen_ids.add(scene_id)
+
+            props = feature.get("properties") or {}
+            assets = feature.get("assets") or {}
+            thumbnail = assets.get("thumbnail") or {}
+            visual = assets.get("visual") or {}
+            granule_metadata = assets.get("granule_metadata") or {}
+
+            scenes_append({
+                "scene_datetime": props.get("datetime"),
+                "scene_id": scene_id,
+                "scene_uri": props.get("s2:product_uri"),
+                "ql_url": thumbnail.get("href"),
+                "vis_url": visual.get("href"),
+                "mtd_url": granule_metadata.get("href"),
+                "cloud_cover": props.get("eo:cloud_cover"),
+                "epsg_code": props.get("proj:epsg"),
+                "bbox": feature.get("bbox"),
+                "geometry": feature.get("geometry")
+            })
+
+        if next_url is None:
+            break
+        response = session.get(url=next_url)
+
+    return scene_info
+
+
+def add_search_messages(scene_info: dict) -> None:
+    """Add the messages and errors collected by search_stac."""
+    for message in scene_info.get("messages", []):
+        add_message(message)
+    for error in scene_info.get("errors", []):
+        add_error(error)
+
+
+def search_stac_batch(url: str, b_boxes: list, start_date: str, end_date: str, collections: tuple,
+                      max_workers: int = search_workers) -> dict:
+    """Search the STAC database for each distinct bounding box concurrently and return the results by bounding box."""
+    try:
+        unique_b_boxes = list(dict.fromkeys(b_boxes))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda b_box: search_stac(url=url, b_box=b_box, start_date=start_date,
+                                                             end_date=end_date, collections=collections),
+                                   unique_b_boxes)
+
+            search_results = dict(zip(unique_b_boxes, results))
+
+        # messages are only added from this thread
+        for scene_info in search_results.values():
+            add_search_messages(scene_info)
+
+        return search_results
+
+    except Exception as e:
+        add_error(f"Error while searching STAC: {traceback.format_exc()}")
         raise
 
 
-def search_stac(url: str, b_box: str, start_date: str, end_date: str, collections: list) -> dict:
-    """Search the STAC database for scenes within the specified bounding box and date range."""
+def group_bboxes(b_boxes: list, cell_size: float = search_cell_size) -> list:
+    """
+    Group bounding box strings by the grid cell (in degrees) of their centre and return, for each bounding box,
+    the union bounding box of its group. Nearby extents then share one search.
+    """
     try:
-        scene_info = defaultdict(list)
-        request_count = 1
-        limit = 50
-        matched = -9999
-        returned = -9999
-
-        params = {
-            "bbox": b_box,
-            "datetime": f"{start_date}T00:00:00Z/{end_date}T23:59:59Z",
-            "collections": collections,
-            "limit": limit,
-            "sortby": "+properties.datetime",
-        }
-
-        # set session and retry
-        session = get_session()
-
-        while returned != 0:
-            if request_count == 1:
-                response = session.get(url=url, params=params)
+        coords = [[float(coord) for coord in b_box.split(",")] for b_box in b_boxes]
+        cells = [(math.floor((x_min + x_max) / 2 / cell_size), math.floor((y_min + y_max) / 2 / cell_size))
+                 for x_min, y_min, x_max, y_max in coords]
+
+        cell_bounds = {}
+        for cell, (x_min, y_min, x_max, y_max) in zip(cells, coords):
+            if cell in cell_bounds:
+                c_x_min, c_y_min, c_x_max, c_y_max = cell_bounds[cell]
+                cell_bounds[cell] = (min(c_x_min, x_min), min(c_y_min, y_min), max(c_x_max, x_max),
+                                     max(c_y_max, y_max))
             else:
-                response = session.get(url=url)
+                cell_bounds[cell] = (x_min, y_min, x_max, y_max)
 
-            if response.status_code != 200:
-                arcpy.AddError(f"Error in request: {response.status_code}")
-                break
+        cell_bbs = {cell: ",".join(str(coord) for coord in bounds) for cell, bounds in cell_bounds.items()}
 
-            response_json = response.json()
+        return [cell_bbs[cell] for cell in cells]
 
-            matched = int(response_json.get("context", {}).get("matched", {}))
-            returned = int(response_json.get("context", {}).get("returned", {}))
-            arcpy.AddMessage(f"limit : {limit}, matched : {matched}, returned : {returned})")
-
-            for link in response_json.get("links", {}):
-                if link.get("rel", {}) == "next":
-                    url = link.get("href", {})
-
-            for feature in response_json.get("features", {}):
-                sc_info = {
-                    "scene_datetime": feature.get("properties", {}).get("datetime", {}),
-                    "scene_id": feature.get("id", {}),
-                    "scene_uri": feature.get("properties", {}).get("s2:product_uri", {}),
-                    "ql_url": feature.get("assets", {}).get("thumbnail", {}).get("href", {}),
-                    "vis_url": feature.get("assets", {}).get("visual", {}).get("href", {}),
-                    "mtd_url": feature.get("assets", {}).get("granule_metadata", {}).get("href", {}),
-                    "cloud_cover": feature.get("properties", {}).get("eo:cloud_cover", {}),
-                    "epsg_code": feature.get("properties", {}).get("proj:epsg", {}),
-                    "bbox": feature.get("bbox", {})
-                }
-                scene_info["scenes"].append(sc_info)
-            request_count += 1
-
-        return scene_info
+    except Exception as e:
+        add_error(f"Error grouping bounding boxes: {traceback.format_exc()}")
+        raise
 
-    except requests.exceptions.RequestException as e:
-        arcpy.AddError(f"Error while searching STAC: {traceback.format_exc()}")
+
+def get_footprints(scene_info: dict) -> list:
+    """Return the WGS84 footprint polygon of each scene, None if the scene has no geometry."""
+    import arcpy
+
+    try:
+        footprints = []
+        for item in scene_info.get("scenes", {}):
+            sc_geometry = item.get("geometry")
+            if sc_geometry:
+                # GeoJSON footprints are in WGS84
+                footprints.append(arcpy.Polygon(arcpy.AsShape(sc_geometry).getPart(), get_wgs84_sr()))
+            else:
+                footprints.append(None)
+
+        return footprints
+
+    except Exception as e:
+        add_error(f"Error creating scene footprints: {traceback.format_exc()}")
+        raise
+
+
+def filter_scenes(scene_info: dict, footprints: list, clip_extent) -> dict:
+    """Keep the scenes whose footprint (from get_footprints) intersects the WGS84 clip polygon."""
+    try:
+        filtered_info = defaultdict(list)
+        for item, footprint in zip(scene_info.get("scenes", []), footprints):
+            if footprint is not None and clip_extent.disjoint(footprint):
+                continue
+            filtered_info["scenes"].append(item)
+
+        return filtered_info
+
+    except Exception as e:
+        add_error(f"Error filtering scenes: {traceback.format_exc()}")
         raise
 
 
@@ -151,80 +479,97 @@ def get_fname_from_url(scene_id: str, file_url: str, file_prefix: str, file_suff
         return fname
 
     except Exception as e:
-        arcpy.AddError(f"Error getting filename for {scene_id}: {traceback.format_exc()}")
+        add_error(f"Error getting filename for {scene_id}: {traceback.format_exc()}")
         raise
 
 
-def download_img(scene_id: str, in_url: str, in_lyr: str, in_clip_fc, out_file: str) -> None:
-    """Download and clip image from a URL."""
-    try:
-        if os.path.exists(out_file):
-            arcpy.AddMessage(f"Image for {scene_id} already exists at {out_file}")
-            return
-
-        if in_url is None:
-            arcpy.AddMessage(f"Warning: Image for {scene_id} is not available.")
-            return
-
-        # set processing extent
-        arcpy.env.extent = "MINOF"
+def get_vsi_path(in_url: str) -> tuple:
+    """
+    Get the GDAL virtual file path and AWS region for a URL. S3 objects are read through /vsis3/
+    to skip the http redirect, other URLs through /vsicurl/.
+    """
+    if in_url.startswith("/vsi"):
+        return in_url, None
 
-        # read url into vrt
-        cog_url = in_url
-        if not cog_url.startswith("/vsicurl/"):
-            cog_url = f"/vsicurl/{cog_url}"
+    match = s3_url_pattern.match(in_url)
+    if match is None:
+        return f"/vsicurl/{in_url}", None
 
-        ds = gdal.OpenEx(cog_url)
-        if ds is None:
-            arcpy.AddError(f"Failed to open dataset for {scene_id}")
-            return
+    return f"/vsis3/{match.group('bucket')}/{match.group('key')}", match.group("region")
 
-        # download and clip
-        gdal.Translate(in_lyr, ds)
-        arcpy.management.Clip(in_raster=in_lyr, out_raster=out_file, in_template_dataset=in_clip_fc,
-                              clipping_geometry="NONE", maintain_clipping_extent="NO_MAINTAIN_EXTENT")
-        arcpy.AddMessage(f"saved image for {scene_id} in {out_file}")
 
-        return
+def download_img(scene_id: str, in_url: str, out_bounds: tuple, out_file: str) -> str:
+    """
+    Download image from a URL clipped to the bounds (xmin, ymin, xmax, ymax) in the image projection.
+    Only the tiles within the bounds are read. Return a status message.
+    """
+    if os.path.exists(out_file):
+        return f"Image for {scene_id} already exists at {out_file}"
 
-    except Exception as e:
-        arcpy.AddError(f"Error downloading image for {scene_id}: {traceback.format_exc()}")
-        raise
+    if in_url is None:
+        return f"Warning: Image for {scene_id} is not available."
 
+    gdal = get_gdal()
+    cog_url, region = get_vsi_path(in_url)
 
-def download_mtd(session: requests.Session, scene_id: str, in_url: str, out_file: str) -> None:
-    """Download image metadata from a URL."""
+    # download and clip. the bounds are in the image projection, so the source pixels are copied unchanged.
+    # write to a partial file so that a failed download is not taken as complete. AWS_REGION is always set
+    # (None clears it) so that a pooled thread does not reuse the region of an earlier job
+    x_min, y_min, x_max, y_max = out_bounds
+    part_file = f"{out_file}.part"
     try:
-        if os.path.exists(out_file):
-            arcpy.AddMessage(f"metadata for {scene_id} exists in {out_file}")
-            return
+        with gdal_thread_config({**gdal_config, "AWS_REGION": region}):
+            ds = gdal.Translate(part_file, cog_url, format="GTiff", projWin=[x_min, y_max, x_max, y_min],
+                                creationOptions=["TILED=YES", "COMPRESS=DEFLATE", "PREDICTOR=2",
+                                                 f"NUM_THREADS={gdal_threads}"])
+            if ds is None:
+                return f"Warning: Failed to open dataset for {scene_id}"
+            ds = None
 
-        if in_url is None:
-            arcpy.AddMessage(f"WARNING metadata for {scene_id} is not available")
-            return
+        os.replace(part_file, out_file)
 
-        with open(out_file, "w") as f:
-            response = session.get(url=in_url)
-            if response.status_code == 200:
-                f.write(response.text)
-                arcpy.AddMessage(f"saved metadata for {scene_id} in {out_file}")
+    finally:
+        if os.path.exists(part_file):
+            os.remove(part_file)
 
-        return
+    return f"saved image for {scene_id} in {out_file}"
 
-    except Exception as e:
-        arcpy.AddError(f"Error downloading metadata for {scene_id}: {traceback.format_exc()}")
-        raise
 
+def download_mtd(session: requests.Session, scene_id: str, in_url: str, out_file: str) -> str:
+    """Download image metadata from a URL. Return a status message."""
+    if os.path.exists(out_file):
+        return f"metadata for {scene_id} exists in {out_file}"
 
-def get_data(scene_info: dict, out_prefix: str, out_dir: str, temp_dir: str, clip_extent) -> None:
-    """Download image and metadata for each scene"""
+    if in_url is None:
+        return f"WARNING metadata for {scene_id} is not available"
+
+    # stream the response to a partial file so that a failed download is not taken as complete
+    part_file = f"{out_file}.part"
     try:
-        # set session and retry
-        session = get_session()
+        with session.get(url=in_url, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                return f"WARNING metadata for {scene_id} could not be downloaded: {response.status_code}"
+
+            with open(part_file, "wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+
+        os.replace(part_file, out_file)
+
+    finally:
+        if os.path.exists(part_file):
+            os.remove(part_file)
 
-        count_download = 0
-        total_download = len(scene_info.get("scenes", {}))
+    return f"saved metadata for {scene_id} in {out_file}"
 
+
+def get_jobs(scene_info: dict, out_prefix: str, out_dir: str, clip_extent) -> list:
+    """Create the list of image and metadata download jobs for each scene"""
+    import arcpy
+
+    try:
+        jobs = []
+        proj_cache = {}
         for item in scene_info.get("scenes", {}):
             scene_id = item.get("scene_id")
             vis_url = item.get("vis_url")
@@ -235,27 +580,86 @@ def get_data(scene_info: dict, out_prefix: str, out_dir: str, temp_dir: str, cli
                                            file_suffix="TCI")
             mtd_fname = get_fname_from_url(scene_id=scene_id, file_url=mtd_url, file_prefix=out_prefix,
                                            file_suffix="metadata")
-            vrt_fname = f"{scene_id}_TCI.vrt"
 
             vis_file = os.path.join(out_dir, vis_fname)
             mtd_file = os.path.join(out_dir, mtd_fname)
-            vrt_lyr = os.path.join(temp_dir, vrt_fname)
 
-            # project clip extent polygon
-            clip_extent_proj = clip_extent.projectAs(arcpy.SpatialReference(epsg_code))
+            # skip scenes downloaded in a previous run
+            if os.path.exists(vis_file) and os.path.exists(mtd_file):
+                add_message(f"image and metadata for {scene_id} already exist in {out_dir}")
+                continue
 
-            # download image
-            download_img(scene_id=scene_id, in_url=vis_url, in_lyr=vrt_lyr, in_clip_fc=clip_extent_proj,
-                         out_file=vis_file)
+            # project clip extent polygon once per projection and use its envelope as output bounds
+            if epsg_code not in proj_cache:
+                clip_extent_proj = clip_extent.projectAs(arcpy.SpatialReference(epsg_code)).extent
+                proj_cache[epsg_code] = (clip_extent_proj.XMin, clip_extent_proj.YMin,
+                                         clip_extent_proj.XMax, clip_extent_proj.YMax)
+            out_bounds = proj_cache[epsg_code]
 
-            # download metadata
-            download_mtd(scene_id=scene_id, session=session, in_url=mtd_url, out_file=mtd_file)
+            jobs.append((scene_id, vis_url, mtd_url, vis_file, mtd_file, out_bounds))
 
-            count_download += 1
-            arcpy.AddMessage(f"downloaded {count_download} of {total_download} images")
+        return jobs
+
+    except Exception as e:
+        add_error(f"Error creating download jobs: {traceback.format_exc()}")
+        raise
+
+
+def download_jobs(jobs: list, max_workers: int = download_workers) -> None:
+    """Download image and metadata for each job concurrently"""
+    # set session and retry. the session is shared by all download threads
+    session = get_session()
+
+    # drop jobs writing to the same files, e.g. polygons with the same prefix overlapping one scene
+    unique_jobs = {}
+    for job in jobs:
+        unique_jobs.setdefault((job[3], job[4]), job)
+    jobs = list(unique_jobs.values())
+
+    count_download = 0
+    total_download = len(jobs)
+
+    # messages are only added from this thread
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        pending = defaultdict(int)
+        for job_id, job in enumerate(jobs):
+            scene_id, vis_url, mtd_url, vis_file, mtd_file, out_bounds = job
+            futures[executor.submit(download_img, scene_id=scene_id, in_url=vis_url, out_bounds=out_bounds,
+                                    out_file=vis_file)] = job_id
+            futures[executor.submit(download_mtd, scene_id=scene_id, session=session, in_url=mtd_url,
+                                    out_file=mtd_file)] = job_id
+            pending[job_id] += 2
+
+        # count a scene as downloaded once both its image and metadata are done. errors raised in the
+        # download threads are reported here
+        for future in as_completed(futures):
+            job_id = futures[future]
+            try:
+                add_message(future.result())
+            except Exception as e:
+                add_error(f"Error downloading data for {jobs[job_id][0]}: {traceback.format_exc()}")
+                for other_future in futures:
+                    other_future.cancel()
+                raise
+
+            pending[job_id] -= 1
+            if pending[job_id] == 0:
+                count_download += 1
+                add_message(f"downloaded {count_download} of {total_download} images")
+
+    return
+
+
+def get_data(scene_info: dict, out_prefix: str, out_dir: str, clip_extent,
+             max_workers: int = download_workers) -> None:
+    """Download image and metadata for each scene"""
+    try:
+        jobs = get_jobs(scene_info=scene_info, out_prefix=out_prefix, out_dir=out_dir, clip_extent=clip_extent)
+        download_jobs(jobs=jobs, max_workers=max_workers)
 
         return
 
     except Exception as e:
-        arcpy.AddError(f"Error getting data: {traceback.format_exc()}")
+        add_error(f"Error getting data: {traceback.format_exc()}")
         raise